@@ -73,12 +73,13 @@ Notes for reviewers
 import argparse
 import csv
 import os
-import random
-import uuid
 from datetime import datetime, timedelta
 from calendar import monthrange
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import numpy as np
+
 # ----------------------------
 # Scenario controls (for insights & recommendations)
 # ----------------------------
@@ -127,24 +128,92 @@ def parse_month(month_str: str):
     end = start + timedelta(days=days_in_month)  # exclusive
     return start, end
 
-def rand_dt(start: datetime, end: datetime) -> datetime:
-    """Uniform random datetime in [start, end)."""
-    delta = end - start
-    seconds = int(delta.total_seconds())
-    if seconds <= 0:
-        return start
-    return start + timedelta(seconds=random.randrange(seconds))
-
-def iso(dt: datetime) -> str:
-    return dt.strftime("%Y-%m-%d %H:%M:%S")
+NO_SIGNUP = np.iinfo(np.int64).min  # user_meta["signup_sec"] sentinel for unknown signup (same bits as NaT)
+
+def iso(ts: np.ndarray):
+    """Format a datetime64 column as "YYYY-MM-DD HH:MM:SS" strings in one C pass (NaT -> "")."""
+    out = np.char.replace(np.datetime_as_string(ts, unit="s"), "T", " ")
+    out[np.isnat(ts)] = ""
+    return out
+
+def bulk_uuid4(n: int, rng: np.random.Generator):
+    """n version-4 UUID strings built from one 16*n byte draw (reproducible given the rng)."""
+    buf = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).copy().reshape(n, 16)
+    buf[:, 6] = (buf[:, 6] & 0x0F) | 0x40  # version 4
+    buf[:, 8] = (buf[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    # lay the 32 hex digits of each id into a 36-char 8-4-4-4-12 template plus a newline,
+    # then decode the whole block once and split it, instead of slicing/formatting per id
+    hexed = np.frombuffer(buf.tobytes().hex().encode("ascii"), dtype=np.uint8).reshape(n, 32)
+    out = np.full((n, 37), ord("\n"), dtype=np.uint8)
+    out[:, np.r_[0:8, 9:13, 14:18, 19:23, 24:36]] = hexed
+    out[:, [8, 13, 18, 23]] = ord("-")
+    return out.tobytes().decode("ascii").split("\n")[:-1]
+
+# each octet's decimal digits right-aligned in 3 bytes, left-padded with NUL (stripped after layout)
+OCTET_DIGITS = np.array([list(f"{i:>3}".replace(" ", "\0").encode("ascii")) for i in range(256)], dtype=np.uint8)
+
+def ipv4_strings(octets: np.ndarray):
+    """Dotted-quad strings for a (4, n) array of octets, laid out in one byte block like bulk_uuid4."""
+    n = octets.shape[1]
+    out = np.full((n, 16), ord("."), dtype=np.uint8)
+    out[:, 15] = ord("\n")
+    out[:, np.r_[0:3, 4:7, 8:11, 12:15]] = OCTET_DIGITS[octets.T].reshape(n, 12)
+    return out.tobytes().replace(b"\0", b"").decode("ascii").split("\n")[:-1]
+
+CSV_CHUNK_ROWS = 100_000
+
+def csv_column(col):
+    """One column as a plain Python list for csv.writer (datetime64 is formatted in bulk via iso())."""
+    if isinstance(col, np.ndarray):
+        if col.dtype.kind == "M":
+            return iso(col).tolist()
+        if col.dtype.kind == "f":
+            # amounts: 2 decimals, NaN (missing) -> ""
+            return ["" if v != v else f"{v:.2f}" for v in col.tolist()]
+        return col.tolist()
+    return col
+
+def write_csv(path: str, fieldnames, columns, append: bool = False):
+    """Write a table held as {column_name: values} — rows are streamed as tuples in fieldnames order.
+
+    append=True adds the rows to an existing file without repeating the header (batched generation).
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # 1 MiB buffer: the default ~8 KB one flushes to disk every few dozen rows
+    with open(path, "a" if append else "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        w = csv.writer(f)
+        if not append:
+            w.writerow(fieldnames)
+        # columns stay typed arrays until here and are unboxed (one C-level tolist() per column)
+        # a chunk of rows at a time, so only CSV_CHUNK_ROWS rows of Python objects are ever alive
+        cols = [columns[name] for name in fieldnames]
+        for start in range(0, len(cols[0]), CSV_CHUNK_ROWS):
+            w.writerows(zip(*(csv_column(col[start:start + CSV_CHUNK_ROWS]) for col in cols)))
+
+def write_parquet(path: str, fieldnames, columns):
+    """Write a table held as {column_name: values} to a snappy Parquet file, keeping native column types.
+
+    pyarrow is only needed for this output format, so it is imported here rather than at module level.
+    Blank strings, NaN and NaT are stored as nulls (the CSV loader maps "" to NULL the same way).
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise SystemExit("--format parquet requires pyarrow (pip install pyarrow)") from e
 
-def write_csv(path: str, fieldnames, rows):
     os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+    table = pa.table({
+        name: pa.array(np.asarray(columns[name]), mask=_null_mask(columns[name]))
+        for name in fieldnames
+    })
+    pq.write_table(table, path, compression="snappy")
+
+def generate_and_write(generate, write_table, path, fieldnames, **kwargs):
+    """Worker task: build one table and write it from the same process, so it is pickled back only once."""
+    table = generate(**kwargs)
+    write_table(path, fieldnames, table)
+    return table
 
 # ----------------------------
 # Data generation
@@ -158,7 +227,17 @@ LAST_NAMES = [
     "Simon","Michel","Lefevre","Garcia","David","Bertrand","Roux","Vincent","Fournier","Morel",
 ]
 COUNTRIES = ["FR","PT","ES","DE","IT","NL","BE","GB","IE","CH"]
+
+# scenario lookups aligned with COUNTRIES: per-user/per-txn values become one array gather by country index
+COUNTRY_IDX = {c: i for i, c in enumerate(COUNTRIES)}
+COUNTRY_P = np.array([COUNTRY_WEIGHTS[c] for c in COUNTRIES], dtype=float)
+COUNTRY_P /= COUNTRY_P.sum()
+ADOPT_ARR = np.array([FEATURE_ADOPTION_RATE.get(c, 0.25) for c in COUNTRIES])
+MULT_ARR = np.array([AMOUNT_MULTIPLIER.get(c, 1.0) for c in COUNTRIES])
 CURRENCIES = ["BTC", "EUR", "USD"]
+CURRENCY_P = [0.85, 0.10, 0.05]
+STATUSES = ["completed", "pending", "failed"]
+STATUS_P = [0.90, 0.07, 0.03]
 
 EVENT_TYPES = ["login", "page_view", "button_click", "logout"]
 PAGES = ["/home", "/wallet", "/send", "/receive", "/settings", "/help", "/profile"]
@@ -166,347 +245,355 @@ BUTTONS = ["send_now", "request_money", "add_card", "logout", "support_chat", "c
 DEVICES = ["android", "ios", "web"]
 OS_LIST = ["Android 14", "Android 13", "iOS 26", "iOS 18", "Windows 11", "macOS 14", "Ubuntu 22.04"]
 
-def generate_users(n_users: int, month_start: datetime, month_end: datetime,
+# object-array copies of the vocabularies: a whole column is one integer draw + a fancy index (see pick())
+FIRST_NAMES_ARR = np.array(FIRST_NAMES, dtype=object)
+LAST_NAMES_ARR = np.array(LAST_NAMES, dtype=object)
+EMAIL_FIRST_ARR = np.array([f"{fn.lower()}." for fn in FIRST_NAMES], dtype=object)
+EMAIL_LAST_ARR = np.array([ln.lower() for ln in LAST_NAMES], dtype=object)
+COUNTRIES_ARR = np.array(COUNTRIES, dtype=object)
+EVENT_TYPES_ARR = np.array(EVENT_TYPES, dtype=object)
+PAGES_ARR = np.array(PAGES, dtype=object)
+BUTTONS_ARR = np.array(BUTTONS, dtype=object)
+DEVICES_ARR = np.array(DEVICES, dtype=object)
+OS_ARR = np.array(OS_LIST, dtype=object)
+CURRENCIES_ARR = np.array(CURRENCIES, dtype=object)
+STATUSES_ARR = np.array(STATUSES, dtype=object)
+
+def pick(vocab: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """n uniform draws from a small vocabulary array."""
+    return vocab[rng.integers(0, len(vocab), size=n)]
+
+def generate_users(n_users: int, month_start: datetime, month_end: datetime, rng: np.random.Generator,
                    null_email_rate=0.01, null_signup_rate=0.01): # just a small fraction of users with missing email or signup_at
-    users = []
-    user_meta = {}
-
-    countries = list(COUNTRY_WEIGHTS.keys())
-    weights = list(COUNTRY_WEIGHTS.values())
-
-    for user_id in range(1, n_users + 1):
-        fn = random.choice(FIRST_NAMES)
-        ln = random.choice(LAST_NAMES)
-        base_email = f"{fn}.{ln}{random.randint(10,9999)}@example.com".lower()
-
-        signup_dt = rand_dt(month_start, month_end)
-
-        # anomalies (probabilistic)
-        if random.random() < null_signup_rate:
-            signup_dt_val = ""
-            signup_dt_obj = None
-        else:
-            signup_dt_val = iso(signup_dt)
-            signup_dt_obj = signup_dt
-
-        email_val = "" if random.random() < null_email_rate else base_email
-
-        # scenario: weighted country distribution
-        country = random.choices(countries, weights=weights, k=1)[0]
-
-        # scenario: feature adoption flag (who actually uses P2P feature)
-        adopt_p = FEATURE_ADOPTION_RATE.get(country, 0.25)
-        is_feature_user = (random.random() < adopt_p)
-
-        users.append({
-            "user_id": user_id,
-            "first_name": fn,
-            "last_name": ln,
-            "email": email_val,
-            "country": country,
-            "signup_at": signup_dt_val,
-        })
-
-        user_meta[user_id] = {
-            "signup_dt": signup_dt_obj,
-            "country": country,
-            "is_feature_user": is_feature_user,
-        }
+    # all random draws are done in one vector call per column (no per-user RNG calls)
+    fn_idx = rng.integers(0, len(FIRST_NAMES), size=n_users)
+    ln_idx = rng.integers(0, len(LAST_NAMES), size=n_users)
+    email_disc = rng.integers(10, 10000, size=n_users)
+    signup_sec = rng.integers(0, int((month_end - month_start).total_seconds()), size=n_users)
+    null_signup = rng.random(n_users) < null_signup_rate
+    null_email = rng.random(n_users) < null_email_rate
+
+    # scenario: weighted country distribution
+    country_idx = rng.choice(len(COUNTRIES), size=n_users, p=COUNTRY_P)
+
+    # scenario: feature adoption flag (who actually uses P2P feature)
+    is_feature = rng.random(n_users) < ADOPT_ARR[country_idx]
+
+    signup_at = np.datetime64(month_start, "s") + signup_sec.astype("timedelta64[s]")
+
+    # anomalies (probabilistic)
+    signup_at[null_signup] = np.datetime64("NaT")
+
+    # email = lower(first) + "." + lower(last) + discriminator + domain, built column-wise
+    email = (EMAIL_FIRST_ARR[fn_idx] + EMAIL_LAST_ARR[ln_idx]) + (email_disc.astype(str).astype(object) + "@example.com")
+    email[null_email] = ""
+
+    users = {
+        "user_id": np.arange(1, n_users + 1),
+        "first_name": FIRST_NAMES_ARR[fn_idx],
+        "last_name": LAST_NAMES_ARR[ln_idx],
+        "email": email,
+        "country": COUNTRIES_ARR[country_idx],
+        "signup_at": signup_at,
+    }
+
+    # per-user lookups for the other generators: arrays indexed by uid (slot 0 unused)
+    user_meta = {
+        "signup_sec": np.concatenate(([NO_SIGNUP], signup_at.astype(np.int64))),  # NaT -> NO_SIGNUP
+        "country_idx": np.concatenate(([0], country_idx)).astype(np.uint8),       # position in COUNTRIES
+        "is_feature_user": np.concatenate(([False], is_feature)),
+    }
 
     return users, user_meta
 
+def transaction_anomaly_counts(n_txns: int, before_signup_rate, null_amount_rate, dup_id_rate):
+    """Rows to inject per transaction anomaly class (at least one each), in plan order.
+
+    A duplicate id needs an earlier row to copy, so a single-row table gets no duplicate.
+    """
+    return (max(1, int(n_txns * before_signup_rate)),
+            max(1, int(n_txns * null_amount_rate)),
+            max(1, int(n_txns * dup_id_rate)))
+
+def event_anomaly_counts(n_events: int, orphan_user_rate, null_event_type_rate, out_of_window_rate):
+    """Rows to inject per app-event anomaly class (at least one each), in plan order."""
+    return (max(1, int(n_events * orphan_user_rate)),
+            max(1, int(n_events * null_event_type_rate)),
+            max(1, int(n_events * out_of_window_rate)))
+
+def _anomaly_plan(n_rows: int, counts, rng: np.random.Generator, first_rows=None):
+    """
+    Sorted row indices per anomaly class; class k may only use rows first_rows[k]..n_rows-1 (default 0).
+
+    Normally one draw of disjoint rows (from the latest first row on), split per class. When the classes
+    do not fit side by side, each class is drawn on its own instead, so classes may share rows but every
+    class still gets its count (or every row it may use) rather than the later classes being cut short.
+    """
+    first_rows = first_rows or (0,) * len(counts)
+    start = max(first_rows)
+    if sum(counts) <= n_rows - start:
+        plan = start + rng.choice(n_rows - start, size=sum(counts), replace=False)
+        parts = np.split(plan, np.cumsum(counts)[:-1])
+    else:
+        parts = []
+        for k, first in zip(counts, first_rows):
+            available = max(0, n_rows - first)
+            parts.append(first + rng.choice(available, size=min(k, available), replace=False))
+    return [np.sort(idx) for idx in parts]
+
+def _split_counts(totals, capacity):
+    """
+    Share each class's table-wide count across batches in proportion to the rows a batch can still take
+    (largest remainder, integer arithmetic), so the batches add up to exactly the unbatched totals.
+    Like the unbatched min() in the generators, classes that no longer fit are truncated, later ones first.
+    """
+    capacity = np.asarray(capacity, dtype=np.int64).copy()
+    per_class = []
+    for total in totals:
+        room = int(capacity.sum())
+        total = min(total, room)
+        alloc = np.zeros_like(capacity)
+        if total:
+            alloc, remainder = np.divmod(total * capacity, room)
+            alloc[np.argsort(-remainder, kind="stable")[:total - int(alloc.sum())]] += 1
+        capacity -= alloc
+        per_class.append(alloc.tolist())
+    return list(zip(*per_class))
+
 def generate_transactions(
     n_txns: int,
     n_users: int,
     month_start: datetime,
     month_end: datetime,
     user_meta,
+    rng: np.random.Generator,
     before_signup_rate=0.02,
     dup_id_rate=0.01,
     null_amount_rate=0.01,
+    anomaly_counts=None,  # exact (before-signup, NULL amount, duplicate id) rows; default: from the rates
 ):
-    txns = []
+    # Columnar (one array per field) generation: every column is filled by a handful of
+    # vector calls and only the final rows touch Python strings.
+    month_start_sec = np.datetime64(month_start, "s").astype(np.int64)
+    month_end_sec = np.datetime64(month_end, "s").astype(np.int64)
+
+    uid_cidx = user_meta["country_idx"]
+    uid_signup = user_meta["signup_sec"]
 
     # precompute "feature users" (adopted users generate transactions)
-    feature_users = [uid for uid in range(1, n_users + 1) if user_meta[uid]["is_feature_user"]]
+    feature_users = np.flatnonzero(user_meta["is_feature_user"])
     if len(feature_users) < 10:
-        feature_users = list(range(1, n_users + 1))  # fallback safety
+        feature_users = np.arange(1, n_users + 1)  # fallback safety
+
+    # sender weights are fixed for the whole run: FR generates more txns, CH generates fewer
+    fu_cidx = uid_cidx[feature_users]
+    sender_w = np.where(fu_cidx == COUNTRY_IDX[TOP_ADOPTION_COUNTRY], 3.0,
+                        np.where(fu_cidx == COUNTRY_IDX[VIP_COUNTRY], 0.4, 1.0))
+    senders = rng.choice(feature_users, size=n_txns, p=sender_w / sender_w.sum())
+    sender_cidx = uid_cidx[senders]
+
+    # receivers: uniform over every user except the sender...
+    receiver_u = rng.random(n_txns)
+    receivers = 1 + (receiver_u * (n_users - 1)).astype(np.int64)
+    receivers += receivers >= senders
+
+    # ...or, with SAME_COUNTRY_RECEIVER_PROB, from the sender's country pool (skipping the sender's slot).
+    # pool holds uids grouped by country (ascending within a country); pool_pos is a uid's rank in its group.
+    pool = np.argsort(uid_cidx[1:], kind="stable") + 1
+    pool_size = np.bincount(uid_cidx[1:], minlength=len(COUNTRIES))
+    pool_start = np.cumsum(pool_size) - pool_size
+    pool_pos = np.zeros(n_users + 1, dtype=np.int64)
+    pool_pos[pool] = np.arange(n_users) - pool_start[uid_cidx[pool]]
+
+    same_country = rng.random(n_txns) < SAME_COUNTRY_RECEIVER_PROB
+    local = np.flatnonzero(same_country & (pool_size[sender_cidx] > 1))
+    j = (receiver_u[local] * (pool_size[sender_cidx[local]] - 1)).astype(np.int64)
+    j += j >= pool_pos[senders[local]]
+    receivers[local] = pool[pool_start[sender_cidx[local]] + j]
 
     # day weighting for crescendo usage
     days = (month_end - month_start).days
-    day_weights = [1.0 + TXN_TREND_STRENGTH * (i / max(1, days - 1)) for i in range(days)]
-    total_w = sum(day_weights)
-    day_probs = [w / total_w for w in day_weights]
-
-    def pick_day_index():
-        r = random.random()
-        s = 0.0
-        for i, p in enumerate(day_probs):
-            s += p
-            if r <= s:
-                return i
-        return days - 1
-
-    def random_dt_in_day(day_idx: int):
-        day_start = month_start + timedelta(days=day_idx)
-        day_end = min(day_start + timedelta(days=1), month_end)
-        return rand_dt(day_start, day_end)
-
-    def pick_sender():
-        # FR generates more txns, CH generates fewer
-        candidates = feature_users
-        w = []
-        for uid in candidates:
-            c = user_meta[uid]["country"]
-            if c == TOP_ADOPTION_COUNTRY:
-                w.append(3.0)
-            elif c == VIP_COUNTRY:
-                w.append(0.4)
-            else:
-                w.append(1.0)
-        return random.choices(candidates, weights=w, k=1)[0]
-
-    def pick_receiver(sender_id: int):
-        sender_country = user_meta[sender_id]["country"]
-
-        if random.random() < SAME_COUNTRY_RECEIVER_PROB:
-            same_country_users = [
-                uid for uid in range(1, n_users + 1)
-                if user_meta[uid]["country"] == sender_country and uid != sender_id
-            ]
-            if same_country_users:
-                return random.choice(same_country_users)
-
-        r = random.randint(1, n_users)
-        while r == sender_id:
-            r = random.randint(1, n_users)
-        return r
-
-    # ----------------------------
-    # Baseline (clean-ish) transaction generation with scenario signals
-    # ----------------------------
-    for _ in range(n_txns):
-        sender_id = pick_sender()
-        receiver_id = pick_receiver(sender_id)
-
-        sender_signup = user_meta[sender_id]["signup_dt"]
-        receiver_signup = user_meta[receiver_id]["signup_dt"]
-
-        day_idx = pick_day_index()
-        created_at = random_dt_in_day(day_idx)
-
-        # enforce baseline lifecycle validity; we inject violations later
-        start_dt = month_start
-        if sender_signup is not None:
-            start_dt = max(start_dt, sender_signup)
-        if receiver_signup is not None:
-            start_dt = max(start_dt, receiver_signup)
-        if created_at < start_dt:
-            created_at = rand_dt(start_dt, month_end)
-
-        # base amount
-        base_amount = (10 ** random.uniform(0.3, 2.2))  # ~2..160
-
-        # crescendo: amounts increase through the month
-        time_scale = 1.0 + AMOUNT_TREND_STRENGTH * (day_idx / max(1, days - 1))
-
-        # VIP country: low count but huge amounts
-        sender_country = user_meta[sender_id]["country"]
-        country_scale = AMOUNT_MULTIPLIER.get(sender_country, 1.0)
-
-        amount = round(base_amount * time_scale * country_scale, 2)
-
-        currency = random.choices(CURRENCIES, weights=[0.85, 0.10, 0.05], k=1)[0]
-        status = random.choices(["completed", "pending", "failed"], weights=[0.90, 0.07, 0.03], k=1)[0]
-
-        txns.append({
-            "transaction_id": str(uuid.uuid4()),
-            "sender_user_id": sender_id,
-            "receiver_user_id": receiver_id,
-            "amount": f"{amount:.2f}",
-            "currency": currency,
-            "status": status,
-            "created_at": iso(created_at),
-        })
+    day_weights = 1.0 + TXN_TREND_STRENGTH * (np.arange(days) / max(1, days - 1))
+    day_cum = np.cumsum(day_weights / day_weights.sum())
+    # first day whose cumulative probability covers the draw; clamp guards float round-off in the last bin
+    day_idx = np.minimum(np.searchsorted(day_cum, rng.random(n_txns)), days - 1)
+    created = month_start_sec + day_idx * 86400 + rng.integers(0, 86400, size=n_txns)
+
+    # enforce baseline lifecycle validity; we inject violations later
+    start_sec = np.maximum(month_start_sec, np.maximum(uid_signup[senders], uid_signup[receivers]))
+    early = np.flatnonzero(created < start_sec)
+    created[early] = start_sec[early] + rng.integers(0, month_end_sec - start_sec[early])
+
+    # base amount ~2..160, crescendo through the month, VIP country: low count but huge amounts
+    # (computed in place in one buffer, no full-size temporaries per step)
+    amount = rng.uniform(0.3, 2.2, size=n_txns)
+    np.power(10.0, amount, out=amount)
+    amount *= 1.0 + AMOUNT_TREND_STRENGTH * (day_idx / max(1, days - 1))
+    amount *= MULT_ARR[sender_cidx]
+    np.round(amount, 2, out=amount)
+
+    # categorical columns stay 1-byte codes and are decoded only when the table is assembled
+    currency_idx = rng.choice(len(CURRENCIES), size=n_txns, p=CURRENCY_P).astype(np.uint8)
+    status_idx = rng.choice(len(STATUSES), size=n_txns, p=STATUS_P).astype(np.uint8)
+    txn_ids = np.array(bulk_uuid4(n_txns, rng), dtype=object)
 
     # ----------------------------
     # Inject anomalies (same as your original intent)
     # ----------------------------
-
-    # 1) Temporal inconsistency: created_at before signup
-    n_before = max(1, int(n_txns * before_signup_rate))
-    eligible_users = [
-        uid for uid in range(1, n_users + 1)
-        if user_meta[uid]["signup_dt"] is not None and user_meta[uid]["signup_dt"] > (month_start + timedelta(days=3))
-    ]
-    for i in random.sample(range(n_txns), k=min(n_before, n_txns)):
-        if eligible_users:
-            bad_user = random.choice(eligible_users)
-            if random.random() < 0.5:
-                txns[i]["sender_user_id"] = bad_user
-            else:
-                txns[i]["receiver_user_id"] = bad_user
-
-            bad_signup = user_meta[bad_user]["signup_dt"]
-            forced_end = max(month_start + timedelta(hours=1), bad_signup - timedelta(minutes=1))
-            txns[i]["created_at"] = iso(rand_dt(month_start, forced_end))
+    # One fused plan: a single draw of disjoint row indices, split per anomaly class (see _anomaly_plan for
+    # when the classes do not fit side by side). Duplicates skip row 0 so every duplicate target has an
+    # earlier row to copy its id from. Each class's indices are sorted so its scatters below walk the
+    # columns front to back.
+    if anomaly_counts is None:
+        anomaly_counts = transaction_anomaly_counts(n_txns, before_signup_rate, null_amount_rate, dup_id_rate)
+    before_idx, null_idx, dup_idx = _anomaly_plan(n_txns, anomaly_counts, rng, first_rows=(0, 0, 1))
+
+    # 1) Temporal inconsistency: created_at before signup of a user who joined after day 3
+    #    (unknown signups and slot 0 hold NO_SIGNUP and never qualify)
+    eligible_users = np.flatnonzero(uid_signup > month_start_sec + 3 * 86400)
+    if len(eligible_users):
+        k = len(before_idx)
+        bad_users = eligible_users[rng.integers(0, len(eligible_users), size=k)]
+        as_sender = rng.random(k) < 0.5
+        senders[before_idx[as_sender]] = bad_users[as_sender]
+        receivers[before_idx[~as_sender]] = bad_users[~as_sender]
+
+        forced_end = np.maximum(month_start_sec + 3600, uid_signup[bad_users] - 60)
+        created[before_idx] = month_start_sec + rng.integers(0, forced_end - month_start_sec)
 
     # 2) NULL amount
-    n_null_amount = max(1, int(n_txns * null_amount_rate))
-    for i in random.sample(range(n_txns), k=min(n_null_amount, n_txns)):
-        txns[i]["amount"] = ""
-
-    # 3) Duplicate transaction IDs (retry logic)
-    n_dupes = max(1, int(n_txns * dup_id_rate))
-    if n_txns > 2:
-        dup_targets = random.sample(range(1, n_txns), k=min(n_dupes, n_txns - 1))
-        for idx in dup_targets:
-            source_idx = random.randrange(0, idx)
-            txns[idx]["transaction_id"] = txns[source_idx]["transaction_id"]
-
-    return txns
-
-def generate_app_events(n_events: int, n_users: int, month_start: datetime, month_end: datetime,
-                        orphan_user_rate=0.01, null_event_type_rate=0.005, out_of_window_rate=0.01):
-    events = []
-
-    def make_ip(): # simple random IPv4
-        return f"{random.randint(1, 255)}.{random.randint(0,255)}.{random.randint(0,255)}.{random.randint(0,255)}"
-
-    for _ in range(n_events):
-        user_id = random.randint(1, n_users)
-        event_type = random.choice(EVENT_TYPES)
-        ts = rand_dt(month_start, month_end)
-        session_id = str(uuid.uuid4())
-        device = random.choice(DEVICES)
-        os_name = random.choice(OS_LIST)
-        page = random.choice(PAGES)
-
-        button_id = ""
-        if event_type == "button_click":
-            button_id = random.choice(BUTTONS)
-
-        events.append({
-            "event_id": str(uuid.uuid4()),
-            "user_id": user_id,
-            "event_type": event_type,
-            "event_ts": iso(ts),
-            "session_id": session_id,
-            "page": page,
-            "button_id": button_id,
-            "device": device,
-            "os": os_name,
-            "ip": make_ip(),
-        })
+    amount[null_idx] = np.nan
+
+    # 3) Duplicate transaction IDs (retry logic): copy the id of some earlier row
+    txn_ids[dup_idx] = txn_ids[rng.integers(0, dup_idx)]
+
+    return {
+        "transaction_id": txn_ids,
+        "sender_user_id": senders,
+        "receiver_user_id": receivers,
+        "amount": amount,
+        "currency": CURRENCIES_ARR[currency_idx],
+        "status": STATUSES_ARR[status_idx],
+        "created_at": created.astype("datetime64[s]"),
+    }
+
+def generate_app_events(n_events: int, n_users: int, month_start: datetime, month_end: datetime, rng: np.random.Generator,
+                        orphan_user_rate=0.01, null_event_type_rate=0.005, out_of_window_rate=0.01,
+                        anomaly_counts=None):  # exact (orphan, NULL event_type, out-of-window) rows; default: from the rates
+    month_start_sec = np.datetime64(month_start, "s").astype(np.int64)
+    month_end_sec = np.datetime64(month_end, "s").astype(np.int64)
+
+    user_id = rng.integers(1, n_users + 1, size=n_events)
+    event_type = pick(EVENT_TYPES_ARR, n_events, rng)
+    event_ts = rng.integers(month_start_sec, month_end_sec, size=n_events)
+    device = pick(DEVICES_ARR, n_events, rng)
+    os_name = pick(OS_ARR, n_events, rng)
+    page = pick(PAGES_ARR, n_events, rng)
+
+    button_id = np.full(n_events, "", dtype=object)
+    clicks = event_type == "button_click"
+    button_id[clicks] = pick(BUTTONS_ARR, int(clicks.sum()), rng)
+
+    # simple random IPv4: one octet array per position, formatted in bulk
+    octets = rng.integers(0, 256, size=(4, n_events))
+    octets[0] = rng.integers(1, 256, size=n_events)
+    ip = ipv4_strings(octets)
 
     # ----------------------------
     # Inject anomalies in app events
     # ----------------------------
+    # One fused plan, as in generate_transactions: a single draw of disjoint row indices, split per
+    # anomaly class and sorted within each class (each class drawn on its own if they do not fit).
+    if anomaly_counts is None:
+        anomaly_counts = event_anomaly_counts(n_events, orphan_user_rate, null_event_type_rate, out_of_window_rate)
+    orphan_idx, null_type_idx, oow_idx = _anomaly_plan(n_events, anomaly_counts, rng)
+
     # 4) Orphan foreign keys: user_id does not exist
-    n_orphan = max(1, int(n_events * orphan_user_rate))
-    for i in random.sample(range(n_events), k=min(n_orphan, n_events)):
-        events[i]["user_id"] = n_users + random.randint(1, 50)  # non-existent user ids
+    user_id[orphan_idx] = n_users + rng.integers(1, 51, size=len(orphan_idx))  # non-existent user ids
 
     # 5) NULL critical field: event_type missing
-    n_null_type = max(1, int(n_events * null_event_type_rate))
-    for i in random.sample(range(n_events), k=min(n_null_type, n_events)):
-        events[i]["event_type"] = ""
+    event_type[null_type_idx] = ""
 
     # 6) Out-of-window timestamps (before month or after month)
-    n_oow = max(1, int(n_events * out_of_window_rate))
-    for i in random.sample(range(n_events), k=min(n_oow, n_events)):
-        if random.random() < 0.5:
-            # before the month
-            ts = rand_dt(month_start - timedelta(days=5), month_start)
-        else:
-            # after the month
-            ts = rand_dt(month_end, month_end + timedelta(days=5))
-        events[i]["event_ts"] = iso(ts)
-
-    return events
+    n_oow = len(oow_idx)
+    five_days = 5 * 86400
+    event_ts[oow_idx] = np.where(
+        rng.random(n_oow) < 0.5,
+        rng.integers(month_start_sec - five_days, month_start_sec, size=n_oow),  # before the month
+        rng.integers(month_end_sec, month_end_sec + five_days, size=n_oow),      # after the month
+    )
 
+    return {
+        "event_id": bulk_uuid4(n_events, rng),
+        "user_id": user_id,
+        "event_type": event_type,
+        "event_ts": event_ts.astype("datetime64[s]"),
+        "session_id": bulk_uuid4(n_events, rng),
+        "page": page,
+        "button_id": button_id,
+        "device": device,
+        "os": os_name,
+        "ip": ip,
+    }
 
-from collections import Counter
 
 #now in order to be able to replicate and verify the anomalies we need to summarize them
-DT_FMT = "%Y-%m-%d %H:%M:%S"
-def _is_null(v) -> bool:
-    return v is None or str(v).strip() == ""
-
-def _parse_dt(s: str):
-    if _is_null(s):
-        return None
-    try:
-        return datetime.strptime(str(s), DT_FMT)
-    except ValueError:
-        return None
-    
-def summarize_anomalies(users, txns, events, user_meta, month_start, month_end, n_users_expected: int):
+def _null_mask(col) -> np.ndarray:
+    """True where a value is None/blank (NaN/NaT count as null for numeric/timestamp columns)."""
+    arr = np.asarray(col)
+    if arr.dtype.kind == "f":
+        return np.isnan(arr)
+    if arr.dtype.kind == "M":
+        return np.isnat(arr)
+    arr = arr.astype(object)
+    return np.equal(arr, None) | (np.char.strip(arr.astype(str)) == "")
+
+def summarize_anomalies(users, txns, events, month_start, month_end, n_users_expected: int):
     """
     Compute *observed* anomaly counts from in-memory data.
     This avoids vague 'subset' wording and makes the generator verifiable.
+    Every check is a boolean mask over a whole column, so there is no per-row Python loop.
     """
 
     # Users
-    users_missing_email = sum(1 for u in users if _is_null(u.get("email")))
-    users_missing_signup = sum(1 for u in users if _is_null(u.get("signup_at")))
+    users_missing_email = int(_null_mask(users["email"]).sum())
+    users_missing_signup = int(_null_mask(users["signup_at"]).sum())
 
     # Transactions
-    txn_missing_amount = sum(1 for t in txns if _is_null(t.get("amount")))
-
-    txn_ids = [t.get("transaction_id") for t in txns if not _is_null(t.get("transaction_id"))]
-    c = Counter(txn_ids)
-    dup_ids = [tid for tid, cnt in c.items() if cnt > 1]
-    txn_dup_distinct_ids = len(dup_ids)
-    txn_dup_rows_total = sum(c[tid] for tid in dup_ids)     # all rows involved in duplicated IDs
-    txn_dup_extra_rows = sum(c[tid] - 1 for tid in dup_ids) # duplicates beyond the first occurrence
-
-    # created_at before signup OR unknown signup
-    txn_before_signup_or_unknown = 0
-    for t in txns:
-        created = _parse_dt(t.get("created_at"))
-        if created is None:
-            continue
-
-        sender_id = t.get("sender_user_id")
-        receiver_id = t.get("receiver_user_id")
-
-        # user_meta stores datetime objects for signup (or None)
-        sender_signup = user_meta.get(sender_id, {}).get("signup_dt")
-        receiver_signup = user_meta.get(receiver_id, {}).get("signup_dt")
-
-        # Treat unknown signup as anomalous for lifecycle validation
-        if sender_signup is None or receiver_signup is None:
-            txn_before_signup_or_unknown += 1
-            continue
-
-        if created < sender_signup or created < receiver_signup:
-            txn_before_signup_or_unknown += 1
+    txn_missing_amount = int(_null_mask(txns["amount"]).sum())
+
+    txn_ids = np.asarray(txns["transaction_id"], dtype=object)
+    # ids are ASCII uuids: fixed-width bytes sort faster in np.unique than 4-byte-per-char unicode
+    _, id_counts = np.unique(txn_ids[~_null_mask(txn_ids)].astype("S"), return_counts=True)
+    dup_counts = id_counts[id_counts > 1]
+    txn_dup_distinct_ids = int(dup_counts.size)
+    txn_dup_rows_total = int(dup_counts.sum())                      # all rows involved in duplicated IDs
+    txn_dup_extra_rows = txn_dup_rows_total - txn_dup_distinct_ids  # duplicates beyond the first occurrence
+
+    # created_at before signup OR unknown signup (signup lookup indexed by uid, NaT = unknown/missing user)
+    user_ids = np.asarray(users["user_id"])
+    sender = np.asarray(txns["sender_user_id"])
+    receiver = np.asarray(txns["receiver_user_id"])
+    signup = np.full(max(user_ids.max(initial=0), sender.max(initial=0), receiver.max(initial=0)) + 1,
+                     np.datetime64("NaT"), dtype="datetime64[s]")
+    signup[user_ids] = users["signup_at"]
+
+    created = txns["created_at"]
+    sender_signup = signup[sender]
+    receiver_signup = signup[receiver]
+    # Treat unknown signup as anomalous for lifecycle validation (NaT comparisons are always False)
+    unknown_signup = np.isnat(sender_signup) | np.isnat(receiver_signup)
+    before_signup = (created < sender_signup) | (created < receiver_signup)
+    txn_before_signup_or_unknown = int((~np.isnat(created) & (unknown_signup | before_signup)).sum())
 
     # Events
-    events_missing_type = sum(1 for e in events if _is_null(e.get("event_type")))
+    events_missing_type = int(_null_mask(events["event_type"]).sum())
 
-    valid_users = set(range(1, n_users_expected + 1))
-    events_orphan_user = 0
-    for e in events:
-        uid = e.get("user_id")
-        if uid is None:
-            continue
-        try:
-            uid_int = int(uid)
-        except (TypeError, ValueError):
-            events_orphan_user += 1
-            continue
-        if uid_int not in valid_users:
-            events_orphan_user += 1
+    event_uid = np.asarray(events["user_id"])
+    events_orphan_user = int(((event_uid < 1) | (event_uid > n_users_expected)).sum())
 
-    events_out_of_window = 0
-    for e in events:
-        ts = _parse_dt(e.get("event_ts"))
-        if ts is None:
-            continue
-        if ts < month_start or ts >= month_end:
-            events_out_of_window += 1
+    ts = events["event_ts"]
+    events_out_of_window = int(((ts < np.datetime64(month_start)) | (ts >= np.datetime64(month_end))).sum())
 
     return {
         "users_missing_email": users_missing_email,
@@ -524,12 +611,12 @@ def summarize_anomalies(users, txns, events, user_meta, month_start, month_end,
 # ----------------------------
 # Main
 # ----------------------------
-def main():
-    ap = argparse.ArgumentParser()
-
-    # Output
-    ap.add_argument("--outdir", default=None, help="Output directory for CSVs. Default: <project_root>/Data")
+USERS_FIELDS = ["user_id", "first_name", "last_name", "email", "country", "signup_at"]
+TXNS_FIELDS = ["transaction_id", "sender_user_id", "receiver_user_id", "amount", "currency", "status", "created_at"]
+EVENTS_FIELDS = ["event_id", "user_id", "event_type", "event_ts", "session_id", "page", "button_id", "device", "os", "ip"]
 
+def add_generation_args(ap):
+    """Dataset options (month, seed, sizes, anomaly rates) — shared with 2_build_sqlite_db.py --generate."""
     # Repro / size
     ap.add_argument("--month", default="2026-01", help='Target month "YYYY-MM"')
     ap.add_argument("--seed", type=int, default=42, help="Random seed for reproducibility")
@@ -549,59 +636,140 @@ def main():
     ap.add_argument("--null-event-type-rate", type=float, default=0.005)
     ap.add_argument("--out-of-window-rate", type=float, default=0.01)
 
-    args = ap.parse_args()
+def table_seeds(seed: int):
+    """
+    One child SeedSequence per table (users, transactions, events): each table's random stream depends
+    only on --seed, not on which process generates it or in which order.
+    """
+    return np.random.SeedSequence(seed).spawn(3)
 
-    random.seed(args.seed)
+def dataset_kwargs(args):
+    """Keyword arguments for generate_users / generate_transactions (minus user_meta) / generate_app_events."""
     month_start, month_end = parse_month(args.month)
+    users_seed, txns_seed, events_seed = table_seeds(args.seed)
 
-    # --- Generate data ---
-    users, user_meta = generate_users(
+    users_kw = dict(
         n_users=args.n_users,
         month_start=month_start,
         month_end=month_end,
+        rng=np.random.default_rng(users_seed),
         null_email_rate=args.null_email_rate,
         null_signup_rate=args.null_signup_rate,
     )
-
-    txns = generate_transactions(
+    txns_kw = dict(
         n_txns=args.n_txns,
         n_users=args.n_users,
         month_start=month_start,
         month_end=month_end,
-        user_meta=user_meta,
+        rng=np.random.default_rng(txns_seed),
         before_signup_rate=args.before_signup_rate,
         dup_id_rate=args.dup_id_rate,
         null_amount_rate=args.null_amount_rate,
     )
-
-    events = generate_app_events(
+    events_kw = dict(
         n_events=args.n_events,
         n_users=args.n_users,
         month_start=month_start,
         month_end=month_end,
+        rng=np.random.default_rng(events_seed),
         orphan_user_rate=args.orphan_user_rate,
         null_event_type_rate=args.null_event_type_rate,
         out_of_window_rate=args.out_of_window_rate,
     )
+    return users_kw, txns_kw, events_kw
+
+def iter_dataset(args, batch_size: int = None):
+    """
+    Yield the dataset as (table, fieldnames, columns) pieces, generated in this process without writing files.
+
+    Users always come as one piece (transactions need the full user_meta). With batch_size, transactions and
+    events follow in chunks of at most batch_size rows, each from its own child rng spawned from the table's
+    seed, so a caller that consumes and drops each chunk holds one batch at a time instead of whole tables.
+    Anomaly counts are worked out once per table and split exactly across the batches, so the injected
+    rates match an unbatched run. Duplicate ids are copied within a batch, so batch_size must be at least 2.
+    Output is reproducible for a given --seed and batch_size; without batch_size it matches main()'s CSVs.
+    """
+    if batch_size is not None and batch_size < 2:
+        raise ValueError("batch_size must be at least 2 (a duplicate id needs an earlier row in its batch)")
+
+    users_kw, txns_kw, events_kw = dataset_kwargs(args)
+    _, txns_seed, events_seed = table_seeds(args.seed)
+    users, user_meta = generate_users(**users_kw)
+    yield "users", USERS_FIELDS, users
+
+    # reserved: rows per batch that cannot take an anomaly (row 0 of a transactions batch, see the plan there)
+    for table, fieldnames, generate, kw, n_key, totals, reserved, seed in (
+        ("transactions", TXNS_FIELDS, generate_transactions, dict(txns_kw, user_meta=user_meta), "n_txns",
+         transaction_anomaly_counts(args.n_txns, args.before_signup_rate, args.null_amount_rate, args.dup_id_rate), 1,
+         txns_seed),
+        ("app_events", EVENTS_FIELDS, generate_app_events, events_kw, "n_events",
+         event_anomaly_counts(args.n_events, args.orphan_user_rate, args.null_event_type_rate, args.out_of_window_rate), 0,
+         events_seed),
+    ):
+        if not batch_size:
+            yield table, fieldnames, generate(**kw)
+            continue
+        n_total = kw[n_key]
+        sizes = [min(batch_size, n_total - start) for start in range(0, n_total, batch_size)]
+        counts = _split_counts(totals, [n - reserved for n in sizes])
+        # per-batch child seeds (SeedSequence.spawn; Generator.spawn would need numpy >= 1.25)
+        for n, batch_counts, batch_seed in zip(sizes, counts, seed.spawn(len(sizes))):
+            yield table, fieldnames, generate(**{**kw, n_key: n, "rng": np.random.default_rng(batch_seed),
+                                                 "anomaly_counts": batch_counts})
+
+def main():
+    ap = argparse.ArgumentParser()
+
+    # Output
+    ap.add_argument("--outdir", default=None, help="Output directory for CSVs. Default: <project_root>/Data")
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                    help="Output file format. parquet needs pyarrow and is not read by 2_build_sqlite_db.py")
+
+    ap.add_argument("--workers", type=int, default=min(3, os.cpu_count() or 1),
+                    help="Processes used to generate/write transactions and events in parallel (1 = no pool)")
+    add_generation_args(ap)
+
+    args = ap.parse_args()
+
+    month_start, month_end = parse_month(args.month)
+    users_kw, txns_kw, events_kw = dataset_kwargs(args)
 
     # --- Output paths (stable: always <project_root>/Data by default) ---
     project_root = Path(__file__).resolve().parent.parent
     outdir = Path(args.outdir) if args.outdir else (project_root / "Data")
     outdir.mkdir(parents=True, exist_ok=True)
 
-    users_path = outdir / "users.csv"
-    txns_path = outdir / "transactions.csv"
-    events_path = outdir / "app_events.csv"
+    users_path = outdir / f"users.{args.format}"
+    txns_path = outdir / f"transactions.{args.format}"
+    events_path = outdir / f"app_events.{args.format}"
+
+    write_table = write_parquet if args.format == "parquet" else write_csv
+
+    # --- Generate + write data ---
+    # Users come first (the other tables need user_meta). Transactions and events are then generated
+    # and written by parallel worker processes; only the finished tables come back for the summary.
+    # With --workers 1 the same tasks simply run one after another in this process.
+    users, user_meta = generate_users(**users_kw)
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            users_done = pool.submit(write_table, users_path, USERS_FIELDS, users)
+            txns_done = pool.submit(generate_and_write, generate_transactions, write_table, txns_path,
+                                    TXNS_FIELDS, user_meta=user_meta, **txns_kw)
+            events_done = pool.submit(generate_and_write, generate_app_events, write_table, events_path,
+                                      EVENTS_FIELDS, **events_kw)
+
+            users_done.result()  # surface any write error
+            txns = txns_done.result()
+            events = events_done.result()
+    else:
+        write_table(users_path, USERS_FIELDS, users)
+        txns = generate_and_write(generate_transactions, write_table, txns_path,
+                                  TXNS_FIELDS, user_meta=user_meta, **txns_kw)
+        events = generate_and_write(generate_app_events, write_table, events_path,
+                                    EVENTS_FIELDS, **events_kw)
 
-    write_csv(users_path,
-              ["user_id", "first_name", "last_name", "email", "country", "signup_at"],
-              users)
-    write_csv(txns_path,
-              ["transaction_id", "sender_user_id", "receiver_user_id", "amount", "currency", "status", "created_at"],
-              txns)
-    write_csv(events_path,
-              ["event_id", "user_id", "event_type", "event_ts", "session_id", "page", "button_id", "device", "os", "ip"],
-              events)
+    # --- Observed (what actually ended up in the data) ---
+    observed = summarize_anomalies(users, txns, events, month_start, month_end, args.n_users)
 
     # --- Targets (what we *intended* to inject) ---
     targets = {
@@ -615,14 +783,11 @@ def main():
         "events_out_of_window": max(1, int(args.n_events * args.out_of_window_rate)),
     }
 
-    # --- Observed (what actually ended up in the data) ---
-    observed = summarize_anomalies(users, txns, events, user_meta, month_start, month_end, args.n_users)
-
     # --- Print summary ---
     print("Generated:")
-    print(f" - {users_path} ({len(users)} rows)")
-    print(f" - {txns_path} ({len(txns)} rows)")
-    print(f" - {events_path} ({len(events)} rows)")
+    print(f" - {users_path} ({len(users['user_id'])} rows)")
+    print(f" - {txns_path} ({len(txns['transaction_id'])} rows)")
+    print(f" - {events_path} ({len(events['event_id'])} rows)")
     print(f"\nConfig: month={args.month}, seed={args.seed}, users={args.n_users}, txns={args.n_txns}, events={args.n_events}")
 
     print("\nIntentional anomalies (target -> observed):")
@@ -1,34 +1,70 @@
 """
 Build a small SQLite database from the generated CSVs.
+
+With --generate, the data is generated in-process by 1_data_modelling.py and inserted directly
+(no CSV write + re-parse); --also-write-csv still exports the CSVs to --csv-dir.
 """
 
 import argparse
 import csv
+import importlib.util
 import os
 import sqlite3
+from itertools import islice
 
+# Rows handed to each executemany() call; keeps memory flat regardless of CSV size.
+BATCH_SIZE = 10_000
 
-def empty_to_none(v: str):
-    if v is None:
-        return None
-    v = v.strip()
-    return None if v == "" else v
+# Bulk-load tuning: the DB is rebuilt from scratch each run, so durability can be traded for speed.
+BUILD_PRAGMAS = """
+PRAGMA journal_mode = MEMORY;
+PRAGMA synchronous = OFF;
+PRAGMA temp_store = MEMORY;
+PRAGMA cache_size = -200000;
+"""
 
+# Once built: WAL, so the SQL scripts can read while something else writes. journal_mode is the one setting
+# stored in the file; synchronous (like the other build PRAGMAs) is per-connection, so readers keep their own default.
+FINAL_PRAGMAS = """
+PRAGMA journal_mode = WAL;
+"""
 
-def to_int(v: str):
-    v = empty_to_none(v)
-    return None if v is None else int(v)
+# Helpful indexes for common analytics patterns; built after the bulk load (cheaper than maintaining them per row)
+INDEXES = """
+CREATE INDEX idx_txn_created_at ON transactions(created_at);
+CREATE INDEX idx_txn_sender ON transactions(sender_user_id);
+CREATE INDEX idx_txn_receiver ON transactions(receiver_user_id);
 
+CREATE INDEX idx_evt_ts ON app_events(event_ts);
+CREATE INDEX idx_evt_user ON app_events(user_id);
+CREATE INDEX idx_evt_type ON app_events(event_type);
+"""
 
-def to_float(v: str):
-    v = empty_to_none(v)
-    return None if v is None else float(v)
+GENERATOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "1_data_modelling.py")
 
 
-def read_csv(path: str):
+def load_generator():
+    # the generator's file name starts with a digit, so it cannot be imported with a plain `import`
+    spec = importlib.util.spec_from_file_location("data_modelling", GENERATOR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def read_csv(path: str, fieldnames):
+    """Yield data rows as lists, after checking the header is exactly fieldnames (columns are read by position)."""
     with open(path, "r", encoding="utf-8", newline="") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header != list(fieldnames):
+            raise ValueError(f"{path}: expected columns {list(fieldnames)}, got {header}")
+        yield from reader
+
+
+def insert_batches(cur: sqlite3.Cursor, sql: str, rows, batch_size: int = BATCH_SIZE):
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        cur.executemany(sql, batch)
 
 
 def create_schema(conn: sqlite3.Connection):
@@ -79,104 +115,138 @@ def create_schema(conn: sqlite3.Connection):
             os           TEXT,
             ip           TEXT
         );
-
-        -- Helpful indexes for common analytics patterns
-        CREATE INDEX idx_txn_created_at ON transactions(created_at);
-        CREATE INDEX idx_txn_sender ON transactions(sender_user_id);
-        CREATE INDEX idx_txn_receiver ON transactions(receiver_user_id);
-
-        CREATE INDEX idx_evt_ts ON app_events(event_ts);
-        CREATE INDEX idx_evt_user ON app_events(user_id);
-        CREATE INDEX idx_evt_type ON app_events(event_type);
         """
     )
-    conn.commit()
 
 
+def create_indexes(conn: sqlite3.Connection):
+    conn.executescript(INDEXES)
+
+
+# Loaders convert fields inline (no per-field helper calls): blank after strip() -> NULL, ids -> int, amount -> float.
 def load_users(conn: sqlite3.Connection, users_csv: str):
-    rows = read_csv(users_csv)
+    rows = read_csv(users_csv, ["user_id", "first_name", "last_name", "email", "country", "signup_at"])
     cur = conn.cursor()
 
-    payload = []
-    for r in rows:
-        payload.append(
-            (
-                to_int(r["user_id"]),
-                empty_to_none(r.get("first_name")),
-                empty_to_none(r.get("last_name")),
-                empty_to_none(r.get("email")),
-                empty_to_none(r.get("country")),
-                empty_to_none(r.get("signup_at")),
-            )
+    payload = (
+        (
+            int(user_id) if user_id.strip() else None,
+            first_name.strip() or None,
+            last_name.strip() or None,
+            email.strip() or None,
+            country.strip() or None,
+            signup_at.strip() or None,
         )
+        for user_id, first_name, last_name, email, country, signup_at in rows
+    )
 
-    cur.executemany(
+    insert_batches(
+        cur,
         """
         INSERT INTO users(user_id, first_name, last_name, email, country, signup_at)
         VALUES (?, ?, ?, ?, ?, ?)
         """,
         payload,
     )
-    conn.commit()
 
 
 def load_transactions(conn: sqlite3.Connection, txns_csv: str):
-    rows = read_csv(txns_csv)
+    rows = read_csv(
+        txns_csv,
+        ["transaction_id", "sender_user_id", "receiver_user_id", "amount", "currency", "status", "created_at"],
+    )
     cur = conn.cursor()
 
-    payload = []
-    for r in rows:
-        payload.append(
-            (
-                empty_to_none(r.get("transaction_id")),
-                to_int(r.get("sender_user_id")),
-                to_int(r.get("receiver_user_id")),
-                to_float(r.get("amount")),
-                empty_to_none(r.get("currency")),
-                empty_to_none(r.get("status")),
-                empty_to_none(r.get("created_at")),
-            )
+    payload = (
+        (
+            transaction_id.strip() or None,
+            int(sender) if sender.strip() else None,
+            int(receiver) if receiver.strip() else None,
+            float(amount) if amount.strip() else None,
+            currency.strip() or None,
+            status.strip() or None,
+            created_at.strip() or None,
         )
+        for transaction_id, sender, receiver, amount, currency, status, created_at in rows
+    )
 
-    cur.executemany(
+    insert_batches(
+        cur,
         """
         INSERT INTO transactions(transaction_id, sender_user_id, receiver_user_id, amount, currency, status, created_at)
         VALUES (?, ?, ?, ?, ?, ?, ?)
         """,
         payload,
     )
-    conn.commit()
 
 
 def load_app_events(conn: sqlite3.Connection, events_csv: str):
-    rows = read_csv(events_csv)
+    rows = read_csv(
+        events_csv,
+        ["event_id", "user_id", "event_type", "event_ts", "session_id", "page", "button_id", "device", "os", "ip"],
+    )
     cur = conn.cursor()
 
-    payload = []
-    for r in rows:
-        payload.append(
-            (
-                empty_to_none(r.get("event_id")),
-                to_int(r.get("user_id")),
-                empty_to_none(r.get("event_type")),
-                empty_to_none(r.get("event_ts")),
-                empty_to_none(r.get("session_id")),
-                empty_to_none(r.get("page")),
-                empty_to_none(r.get("button_id")),
-                empty_to_none(r.get("device")),
-                empty_to_none(r.get("os")),
-                empty_to_none(r.get("ip")),
-            )
+    payload = (
+        (
+            event_id.strip() or None,
+            int(user_id) if user_id.strip() else None,
+            event_type.strip() or None,
+            event_ts.strip() or None,
+            session_id.strip() or None,
+            page.strip() or None,
+            button_id.strip() or None,
+            device.strip() or None,
+            os_name.strip() or None,
+            ip.strip() or None,
         )
+        for event_id, user_id, event_type, event_ts, session_id, page, button_id, device, os_name, ip in rows
+    )
 
-    cur.executemany(
+    insert_batches(
+        cur,
         """
         INSERT INTO app_events(event_id, user_id, event_type, event_ts, session_id, page, button_id, device, os, ip)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         payload,
     )
-    conn.commit()
+
+
+def sql_column(gen, col):
+    """One generated column as typed Python values for sqlite3: the CSV's text, native numbers, and None for nulls."""
+    kind = getattr(getattr(col, "dtype", None), "kind", None)  # NumPy columns; numpy itself is not imported here
+    if kind in ("i", "u", "f"):
+        values = col.tolist()
+        if kind == "f":
+            # amounts are already rounded to 2 decimals at generation, so only NaN -> None is needed
+            return [None if v != v else v for v in values]
+        return values
+    # text and timestamps: the generator's CSV strings, blank ("" / NaT) -> None as the CSV loaders do
+    return [v or None for v in gen.csv_column(col)]
+
+
+def load_table(conn: sqlite3.Connection, gen, table: str, fieldnames, columns):
+    """Insert a generated table ({column_name: values}) as typed values, BATCH_SIZE rows per executemany."""
+    sql = f"INSERT INTO {table}({', '.join(fieldnames)}) VALUES ({', '.join('?' * len(fieldnames))})"
+    cols = [columns[name] for name in fieldnames]
+    cur = conn.cursor()
+    for start in range(0, len(cols[0]), BATCH_SIZE):
+        cur.executemany(sql, zip(*(sql_column(gen, col[start:start + BATCH_SIZE]) for col in cols)))
+
+
+def build_db(conn: sqlite3.Connection, gen, gen_args, csv_dir: str = None, batch_size: int = None):
+    """Generate the dataset in-process and load it straight into the DB (optionally also writing the CSVs).
+
+    With batch_size, transactions and events are generated, inserted and dropped one chunk at a time.
+    """
+    written = set()
+    for table, fieldnames, columns in gen.iter_dataset(gen_args, batch_size):
+        if csv_dir is not None:
+            gen.write_csv(os.path.join(csv_dir, f"{table}.csv"), fieldnames, columns, append=table in written)
+            written.add(table)
+        load_table(conn, gen, table, fieldnames, columns)
+        del columns  # release this chunk before the next one is generated
 
 
 def print_counts(conn: sqlite3.Connection):
@@ -187,10 +257,35 @@ def print_counts(conn: sqlite3.Connection):
 
 
 def main():
-    ap = argparse.ArgumentParser()
+    ap = argparse.ArgumentParser(
+        epilog="With --generate, the generator's dataset options are accepted as well: --month, --seed, --n_users, "
+               "--n_txns, --n_events and the anomaly --*-rate knobs (see 1_data_modelling.py --help)."
+    )
     ap.add_argument("--csv-dir", default="./data", help="Folder containing the three CSV files")
     ap.add_argument("--db-path", default="./db/xapo_p2p.sqlite", help="Output SQLite DB path")
-    args = ap.parse_args()
+    ap.add_argument("--generate", action="store_true",
+                    help="Generate the data in-process instead of reading CSVs from --csv-dir (needs numpy)")
+    ap.add_argument("--also-write-csv", action="store_true", help="With --generate, also write the CSVs to --csv-dir")
+    ap.add_argument("--batch-size", type=int, default=None,
+                    help="With --generate, generate and insert transactions/events this many rows at a time "
+                         "(caps memory for very large runs; 0 = whole tables, identical to the CSV generator; "
+                         "otherwise at least 2)")
+    # generation options are only parsed (and the numpy-based generator only loaded) with --generate,
+    # so the plain CSV load stays stdlib-only
+    args, gen_argv = ap.parse_known_args()
+    if args.batch_size is not None and not args.generate:
+        ap.error("--batch-size needs --generate")
+    if args.also_write_csv and not args.generate:
+        ap.error("--also-write-csv needs --generate")
+    if args.batch_size is not None and (args.batch_size < 0 or args.batch_size == 1):
+        ap.error("--batch-size must be 0 (whole tables) or at least 2")
+    if args.generate:
+        gen = load_generator()
+        gen_ap = argparse.ArgumentParser(prog=f"{ap.prog} --generate")
+        gen.add_generation_args(gen_ap)
+        gen_args = gen_ap.parse_args(gen_argv)
+    elif gen_argv:
+        ap.error(f"unrecognized arguments: {' '.join(gen_argv)} (dataset options need --generate)")
 
     users_csv = os.path.join(args.csv_dir, "users.csv")
     txns_csv = os.path.join(args.csv_dir, "transactions.csv")
@@ -198,12 +293,24 @@ def main():
 
     os.makedirs(os.path.dirname(args.db_path), exist_ok=True)
 
-    conn = sqlite3.connect(args.db_path)
+    # autocommit mode: the only transaction is the explicit one around the bulk load
+    conn = sqlite3.connect(args.db_path, isolation_level=None)
     try:
+        conn.executescript(BUILD_PRAGMAS)
         create_schema(conn)
-        load_users(conn, users_csv)
-        load_transactions(conn, txns_csv)
-        load_app_events(conn, events_csv)
+
+        conn.execute("BEGIN IMMEDIATE")
+        if args.generate:
+            build_db(conn, gen, gen_args, csv_dir=args.csv_dir if args.also_write_csv else None,
+                     batch_size=args.batch_size or None)
+        else:
+            load_users(conn, users_csv)
+            load_transactions(conn, txns_csv)
+            load_app_events(conn, events_csv)
+        conn.execute("COMMIT")
+
+        create_indexes(conn)
+        conn.executescript(FINAL_PRAGMAS)
         print(f"DB created at: {args.db_path}")
         print_counts(conn)
     finally: